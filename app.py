@@ -1,11 +1,27 @@
 import streamlit as st
 import pandas as pd
-from tvDatafeed import TvDatafeed, Interval
-from lightweight_charts.widgets import StreamlitChart
-from datetime import timedelta
 import numpy as np
+from tvDatafeed import Interval
+from lightweight_charts.widgets import StreamlitChart
+import plotly.graph_objects as go
+import plotly.io as pio
 import logging
- 
+
+from gann_core import (
+    PROJECTION_PERIODS,
+    build_projection_long,
+    calculate_projected_dates,
+    fetch_data,
+    find_swing_dates,
+    project_dates,
+)
+
+# Serialize figures with the NumPy-aware orjson encoder when it is installed
+try:
+    pio.json.config.default_engine = 'orjson'
+except ValueError:
+    pass
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,107 +30,183 @@ logger = logging.getLogger(__name__)
 st.set_page_config(layout="wide", page_title="Swing Projection Chart")
 st.title("Swing High/Low Projection Chart")
 
-def fetch_data(tv_datafeed, symbol, exchange, interval, n_bars, fut_contract=None):
-    """Fetches historical data for the given symbol and interval."""
-    try:
-        data = tv_datafeed.get_hist(symbol=symbol, exchange=exchange, interval=interval, n_bars=n_bars, fut_contract=fut_contract)
-        if data is not None and not data.empty:
-            # Convert index to UTC and then to Asia/Kolkata
-            data.index = pd.to_datetime(data.index).tz_localize('UTC').tz_convert('Asia/Kolkata')
-            data = data.round(2)
-        else:
-            st.error(f"No data found for {symbol} on {exchange} with interval {interval}")
-        return data
-    except Exception as e:
-        st.error(f"Error fetching data for symbol {symbol}: {e}")
-        logger.error(f"Error fetching data for symbol {symbol}: {e}")
-        return None
-
-def find_swing_dates(data, pvtLenL=3, pvtLenR=3, shunt=1):
-    """Finds all swing high and swing low dates using Pine Script logic."""
-    high_series = data['high']
-    low_series = data['low']
-    dates = data.index
-    
-    swing_high_dates = []
-    swing_high_prices = []
-    swing_low_dates = []
-    swing_low_prices = []
-    
-    for i in range(pvtLenL, len(data) - pvtLenR):
-        current_high = high_series.iloc[i]
-        left_highs = high_series.iloc[i - pvtLenL : i]
-        right_highs = high_series.iloc[i + 1 : i + 1 + pvtLenR]
-        
-        if (current_high > left_highs).all() and (current_high > right_highs).all():
-            swing_high_dates.append(dates[i])
-            swing_high_prices.append(current_high)
-        
-        current_low = low_series.iloc[i]
-        left_lows = low_series.iloc[i - pvtLenL : i]
-        right_lows = low_series.iloc[i + 1 : i + 1 + pvtLenR]
-        
-        if (current_low < left_lows).all() and (current_low < right_lows).all():
-            swing_low_dates.append(dates[i])
-            swing_low_prices.append(current_low)
-    
-    return swing_high_dates, swing_high_prices, swing_low_dates, swing_low_prices
-
-def calculate_projected_dates(dates, prices, type_label):
-    """Calculate projected dates for each swing date."""
-    if not dates:
-        return pd.DataFrame()
-    
-    # Define the projection periods
-    periods = [30, 60, 90, 120, 180, 270, 360]
-    
-    # Create a DataFrame with the base dates and prices
-    df = pd.DataFrame({
-        f'{type_label} Date': dates,
-        f'{type_label} Price': prices
-    })
-    
-    # Calculate and add projected dates
-    for period in periods:
-        df[f'{type_label} +{period}d'] = [date + timedelta(days=period) for date in dates]
-    
-    return df
-
-def generate_vertical_lines(projection_df, type_label, color):
+# Alpha suffixes shading each projection period, palest (30d) to darkest (360d)
+PERIOD_ALPHAS = ('88', '99', 'AA', 'BB', 'CC', 'DD', 'EE')
+
+def period_colors(base_color):
+    """Map each projection period to an alpha-shaded variant of base_color."""
+    return {period: f"{base_color}{alpha}" for period, alpha in zip(PROJECTION_PERIODS, PERIOD_ALPHAS)}
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def prepare_chart_data(data):
+    """Prepare the OHLCV frame in the shape lightweight-charts expects."""
+    # Build straight from the index and column buffers — no reset_index
+    # copy and no rename pass. Prices are two-decimal display values, so
+    # float32 halves the bytes pushed over the component bridge; volume
+    # stays full-width since it can exceed float32's integer range.
+    return pd.DataFrame({
+        'time': data.index.strftime('%Y-%m-%d %H:%M:%S'),
+        'open': data['open'].to_numpy(np.float32),
+        'high': data['high'].to_numpy(np.float32),
+        'low': data['low'].to_numpy(np.float32),
+        'close': data['close'].to_numpy(np.float32),
+        'volume': data['volume'].values
+    }, copy=False)
+
+def generate_vertical_lines(projections, color):
     """Generate vertical line markers for lightweight charts."""
-    vertical_lines = []
-    
-    # Define the projection periods
-    periods = [30, 60, 90, 120, 180, 270, 360]
-    
-    # Generate a different color shade for each period
-    colors = {
-        30: f"{color}88",   # 30 days - lighter
-        60: f"{color}99",
-        90: f"{color}AA",
-        120: f"{color}BB",
-        180: f"{color}CC",
-        270: f"{color}DD",
-        360: f"{color}EE"    # 360 days - darker
-    }
-    
-    for _, row in projection_df.iterrows():
-        for period in periods:
-            date_col = f'{type_label} +{period}d'
-            if pd.notna(row[date_col]):
-                # Format the time correctly for lightweight charts
-                time_str = row[date_col].strftime('%Y-%m-%d')
-                
-                vertical_lines.append({
-                    'time': time_str,
-                    'color': colors[period],
-                    'text': f"{type_label} +{period}d",
-                    'position': 'aboveBar' if type_label == 'Swing High' else 'belowBar',
-                    'shape': 'arrow' if type_label == 'Swing High' else 'arrowUp',
-                    'textColor': colors[period]
-                })
-    
-    return vertical_lines
+    if len(projections) == 0:
+        return []
+
+    type_label = projections.type_label
+    colors = period_colors(color)
+
+    # Long-form table keeps every marker field a single vectorized op
+    markers = build_projection_long(projections.dates)
+    markers['time'] = pd.DatetimeIndex(project_dates(markers)).strftime('%Y-%m-%d')
+    markers['color'] = markers['period_days'].map(colors)
+    markers['text'] = f'{type_label} +' + markers['period_days'].astype(str) + 'd'
+    markers['position'] = 'aboveBar' if type_label == 'Swing High' else 'belowBar'
+    markers['shape'] = 'arrow' if type_label == 'Swing High' else 'arrowUp'
+    markers['textColor'] = markers['color']
+
+    return markers[['time', 'color', 'text', 'position', 'shape', 'textColor']].to_dict('records')
+
+def add_projection_lines(chart, projections, color):
+    """Draw the projected dates as vertical spans, one batch per period."""
+    if len(projections) == 0:
+        return
+
+    colors = period_colors(color)
+
+    lines = build_projection_long(projections.dates)
+    # Format every projected date with one strftime pass over the column
+    lines['time'] = pd.DatetimeIndex(project_dates(lines)).strftime('%Y-%m-%d %H:%M:%S')
+
+    for period, group in lines.groupby('period_days', sort=True):
+        # vertical_span takes the whole date list, so the chart gets one
+        # call per period rather than one series per projected date
+        chart.vertical_span(group['time'].unique().tolist(), color=colors[period])
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def projection_csv(projection_df):
+    """Encode a projection table as CSV bytes, once per distinct table."""
+    return projection_df.to_csv(index=False, lineterminator='\n', float_format='%.2f').encode()
+
+# Above this bar count, SVG candlesticks are replaced with WebGL segments
+SCATTERGL_CANDLE_THRESHOLD = 3000
+
+def build_line_segments(x, y0, y1):
+    """Pack vertical (x, y0)->(x, y1) segments into one pair of separator-delimited arrays."""
+    xs = np.repeat(x, 3)
+    xs[2::3] = None
+    ys = np.empty(len(x) * 3)
+    ys[0::3] = y0
+    ys[1::3] = y1
+    ys[2::3] = np.nan
+    return xs, ys
+
+def add_candlestick_trace(fig, data):
+    """Add the candle layer, emulating candles with Scattergl segments for large bar counts."""
+    if len(data) <= SCATTERGL_CANDLE_THRESHOLD:
+        fig.add_trace(go.Candlestick(
+            x=data.index,
+            open=data['open'].to_numpy(np.float32),
+            high=data['high'].to_numpy(np.float32),
+            low=data['low'].to_numpy(np.float32),
+            close=data['close'].to_numpy(np.float32),
+            name='Candlestick'
+        ))
+        return
+
+    # go.Candlestick is SVG-only and chokes past a few thousand bars;
+    # draw wicks and bodies as three WebGL traces instead
+    x = data.index.to_numpy()
+    opens = data['open'].to_numpy(np.float32)
+    closes = data['close'].to_numpy(np.float32)
+
+    xs, ys = build_line_segments(x, data['low'].to_numpy(np.float32), data['high'].to_numpy(np.float32))
+    fig.add_trace(go.Scattergl(
+        x=xs, y=ys, mode='lines',
+        line=dict(color='#888888', width=1),
+        name='Wicks', hoverinfo='skip'
+    ))
+
+    up = closes >= opens
+    body_low = np.minimum(opens, closes)
+    body_high = np.maximum(opens, closes)
+    for mask, color, name in [(up, '#26A69A', 'Up'), (~up, '#EF5350', 'Down')]:
+        xs, ys = build_line_segments(x[mask], body_low[mask], body_high[mask])
+        fig.add_trace(go.Scattergl(
+            x=xs, y=ys, mode='lines',
+            line=dict(color=color, width=3),
+            name=name, hoverinfo='skip'
+        ))
+
+def plot_candlestick_with_projections(data, high_projections, low_projections, show_projections=True):
+    """Create a Plotly candlestick chart with projected dates drawn as vertical lines."""
+    fig = go.Figure()
+
+    add_candlestick_trace(fig, data)
+
+    if show_projections:
+        # Bounds of the plotted range; lines outside it would never be visible
+        first_bar = data.index[0]
+        last_bar = data.index[-1]
+
+        # Shared y-extent of every vertical line, computed once and padded
+        # so the lines overshoot the candles slightly
+        ymin = float(data['low'].min()) * 0.98
+        ymax = float(data['high'].max()) * 1.02
+
+        for projections, base_color in [
+            (high_projections, '#00FF00'),
+            (low_projections, '#FF0000')
+        ]:
+            if len(projections) == 0:
+                continue
+
+            type_label = projections.type_label
+            colors = period_colors(base_color)
+
+            # Compact long form: one base date plus an int16 offset per row,
+            # with the projected dates materialized only for rendering
+            lines = build_projection_long(projections.dates)
+            lines['projected'] = project_dates(lines)
+
+            # One legend entry per swing type; the group toggles all periods
+            legend_entry_added = False
+            for period, group in lines.groupby('period_days', sort=True):
+                proj = group['projected']
+                # Drop duplicate dates — overlapping lines render identically
+                proj_dates = proj[(proj >= first_bar) & (proj <= last_bar)].unique().to_numpy()
+                if len(proj_dates) == 0:
+                    continue
+
+                # Pack all vertical lines for this period into one trace,
+                # using separator-delimited arrays instead of one shape per date
+                xs, ys = build_line_segments(proj_dates, ymin, ymax)
+
+                fig.add_trace(go.Scattergl(
+                    x=xs,
+                    y=ys,
+                    mode='lines',
+                    line=dict(color=colors[period], width=1, dash='dot'),
+                    name=f'{type_label} projections',
+                    legendgroup=type_label,
+                    showlegend=not legend_entry_added,
+                    hoverinfo='skip'
+                ))
+                legend_entry_added = True
+
+    fig.update_layout(
+        height=800,
+        xaxis_rangeslider_visible=False,
+        yaxis_title='Price',
+        legend=dict(orientation='h', yanchor='bottom', y=1.02)
+    )
+
+    return fig
 
 # Input fields for stock symbol and exchange
 col1, col2, col3 = st.columns(3)
@@ -132,7 +224,7 @@ with col3:
     interval = st.selectbox("Interval", list(interval_options.keys()))
 
 # Configuration options
-col1, col2, col3, col4 = st.columns(4)
+col1, col2, col3, col4, col5 = st.columns(5)
 with col1:
     n_bars = st.slider("Number of bars", 100, 5000, 1000)
 with col2:
@@ -141,71 +233,76 @@ with col3:
     pvtLenR = st.slider("Pivot Length Right", 1, 10, 3)
 with col4:
     show_projections = st.checkbox("Show Projections", True)
+with col5:
+    renderer = st.selectbox("Chart Renderer", ["Lightweight Charts", "Plotly"])
 
 # Button to fetch and display data
 if st.button("Generate Chart"):
     with st.spinner("Fetching data and generating chart..."):
         try:
-            # Initialize TvDatafeed
-            tv = TvDatafeed()
-            
             # Fetch data
-            data = fetch_data(tv, symbol, exchange, interval_options[interval], n_bars)
-            
+            data = fetch_data(symbol, exchange, interval_options[interval], n_bars)
+
             if data is not None and not data.empty:
                 # Find swing highs and lows
                 swing_high_dates, swing_high_prices, swing_low_dates, swing_low_prices = find_swing_dates(data, pvtLenL, pvtLenR)
                 
                 # Calculate projection dates
-                high_projection_df = calculate_projected_dates(swing_high_dates, swing_high_prices, "Swing High")
-                low_projection_df = calculate_projected_dates(swing_low_dates, swing_low_prices, "Swing Low")
-                
-                # Reset index to make date a column
-                chart_data = data.reset_index()
-                
-                # Convert datetime to string format that lightweight charts can handle
-                chart_data['datetime'] = chart_data['datetime'].dt.strftime('%Y-%m-%d %H:%M:%S')
-                
-                # Rename columns to match what lightweight charts expects
-                chart_data = chart_data.rename(columns={
-                    'datetime': 'time',
-                    'open': 'open',
-                    'high': 'high',
-                    'low': 'low',
-                    'close': 'close',
-                    'volume': 'volume'
-                })
-                
+                high_projections = calculate_projected_dates(swing_high_dates, swing_high_prices, "Swing High")
+                low_projections = calculate_projected_dates(swing_low_dates, swing_low_prices, "Swing Low")
+
+                # Wide presentation frames for the tables and CSV exports
+                high_projection_df = high_projections.to_dataframe()
+                low_projection_df = low_projections.to_dataframe()
+
                 # Display summary of the data
                 col1, col2 = st.columns(2)
                 with col1:
                     st.subheader(f"Found {len(swing_high_dates)} Swing Highs")
-                    st.dataframe(high_projection_df.head())
+                    st.dataframe(high_projection_df.head(200))
+                    if len(high_projection_df) > 200:
+                        with st.expander(f"Show all {len(high_projection_df)} swing highs"):
+                            st.dataframe(high_projection_df)
                 with col2:
                     st.subheader(f"Found {len(swing_low_dates)} Swing Lows")
-                    st.dataframe(low_projection_df.head())
+                    st.dataframe(low_projection_df.head(200))
+                    if len(low_projection_df) > 200:
+                        with st.expander(f"Show all {len(low_projection_df)} swing lows"):
+                            st.dataframe(low_projection_df)
                  
                 # Create and display the chart
                 st.subheader(f"Price Chart for {symbol} with Swing Projections")
-                chart = StreamlitChart(width=1200, height=800)
-                
-                # Set the data and markers
-                chart.set(chart_data)
-                 
-                # Load the chart
-                chart.load()
+                if renderer == "Plotly":
+                    fig = plot_candlestick_with_projections(data, high_projections, low_projections, show_projections)
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    # StreamlitChart cannot be reused across reruns: load()
+                    # renders only once per instance and its command log
+                    # grows with every mutation, so build it fresh each time
+                    # (the prepared frame itself is cached)
+                    chart = StreamlitChart(width=1200, height=800)
+
+                    # Set the data and markers
+                    chart.set(prepare_chart_data(data))
+
+                    if show_projections:
+                        add_projection_lines(chart, high_projections, '#00FF00')
+                        add_projection_lines(chart, low_projections, '#FF0000')
+
+                    # Load the chart
+                    chart.load()
                 
                 # Export options
                 st.download_button(
                     label="Download Swing High Projections CSV",
-                    data=high_projection_df.to_csv(index=False),
+                    data=projection_csv(high_projection_df),
                     file_name=f"{symbol}_swing_high_projections.csv",
                     mime="text/csv"
                 )
                 
                 st.download_button(
                     label="Download Swing Low Projections CSV",
-                    data=low_projection_df.to_csv(index=False),
+                    data=projection_csv(low_projection_df),
                     file_name=f"{symbol}_swing_low_projections.csv",
                     mime="text/csv"
                 )
@@ -0,0 +1,254 @@
+"""Shared data-fetching and swing-analytics helpers for the Gann projection app."""
+
+import logging
+from dataclasses import dataclass
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from numpy.lib.stride_tricks import sliding_window_view
+from tvDatafeed import TvDatafeed
+
+# Numba is optional; the NumPy kernel below is used when it is missing
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit so kernels can be decorated unconditionally."""
+        if args and callable(args[0]):
+            return args[0]
+
+        def decorate(func):
+            return func
+        return decorate
+
+logger = logging.getLogger(__name__)
+
+# Resolve the timezones once at import instead of per fetch
+_UTC = ZoneInfo('UTC')
+_IST = ZoneInfo('Asia/Kolkata')
+
+# The Gann projection periods, in days
+PROJECTION_PERIODS = (30, 60, 90, 120, 180, 270, 360)
+
+def build_projection_long(dates):
+    """Build the compact long-form projection table: one base date plus an int16 period per row."""
+    idx = pd.DatetimeIndex(dates)
+    return pd.DataFrame({
+        'base': idx.repeat(len(PROJECTION_PERIODS)),
+        'period_days': np.tile(PROJECTION_PERIODS, len(idx)).astype('int16')
+    }, copy=False)
+
+def project_dates(long_df):
+    """Materialize the projected dates from a long-form projection table."""
+    return long_df['base'] + pd.to_timedelta(long_df['period_days'], unit='D')
+
+@st.cache_resource(show_spinner=False)
+def get_tv_datafeed():
+    """Create the TradingView datafeed client once per process."""
+    return TvDatafeed()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_data(symbol, exchange, interval, n_bars, fut_contract=None):
+    """Fetches historical data for the given symbol and interval.
+
+    Returns None when the feed has no data; fetch errors are re-raised
+    (Streamlit never caches a raising call, so the next click retries)
+    and reported to the user by the caller's exception handler.
+    """
+    try:
+        data = get_tv_datafeed().get_hist(symbol=symbol, exchange=exchange, interval=interval, n_bars=n_bars, fut_contract=fut_contract)
+    except Exception as e:
+        # A long-lived client can be sitting on a dead websocket; rebuild
+        # the singleton and retry once before giving up
+        logger.warning(f"Retrying {symbol} with a fresh TvDatafeed client: {e}")
+        get_tv_datafeed.clear()
+        try:
+            data = get_tv_datafeed().get_hist(symbol=symbol, exchange=exchange, interval=interval, n_bars=n_bars, fut_contract=fut_contract)
+        except Exception as e:
+            logger.error(f"Error fetching data for symbol {symbol}: {e}")
+            raise
+
+    if data is None or data.empty:
+        return None
+
+    # Convert index to Asia/Kolkata, skipping whatever steps the
+    # feed already did for us
+    idx = data.index
+    if not isinstance(idx, pd.DatetimeIndex):
+        idx = pd.to_datetime(idx)
+    if idx.tz is None:
+        idx = idx.tz_localize(_UTC)
+    data.index = idx.tz_convert(_IST)
+
+    # Round only the price columns (volume stays untouched); column .values
+    # are read-only under pandas copy-on-write, so no in-place tricks here
+    data[['open', 'high', 'low', 'close']] = data[['open', 'high', 'low', 'close']].round(2)
+
+    return data
+
+def _swing_indices_numpy(high, low, pvtLenL, pvtLenR):
+    """Find swing pivot indices with NumPy sliding windows."""
+    window = pvtLenL + pvtLenR + 1
+
+    # One rolling window per bar; column pvtLenL is the candidate pivot bar
+    high_windows = sliding_window_view(high, window)
+    low_windows = sliding_window_view(low, window)
+
+    center_high = high_windows[:, pvtLenL]
+    high_mask = (
+        (center_high > high_windows[:, :pvtLenL].max(axis=1)) &
+        (center_high > high_windows[:, pvtLenL + 1:].max(axis=1))
+    )
+
+    center_low = low_windows[:, pvtLenL]
+    low_mask = (
+        (center_low < low_windows[:, :pvtLenL].min(axis=1)) &
+        (center_low < low_windows[:, pvtLenL + 1:].min(axis=1))
+    )
+
+    return np.flatnonzero(high_mask) + pvtLenL, np.flatnonzero(low_mask) + pvtLenL
+
+@njit(cache=True, parallel=True)
+def _high_pivot_mask(high, pvtLenL, pvtLenR):
+    """Mark swing-high bars with an early-exit window test (JIT-compiled when numba is installed)."""
+    n = high.size
+    mask = np.zeros(n, np.bool_)
+
+    # Each iteration writes only its own slot, so prange is race-free
+    for i in prange(pvtLenL, n - pvtLenR):
+        current_high = high[i]
+        is_pivot = True
+        for j in range(i - pvtLenL, i):
+            if high[j] >= current_high:
+                is_pivot = False
+                break
+        if is_pivot:
+            for j in range(i + 1, i + 1 + pvtLenR):
+                if high[j] >= current_high:
+                    is_pivot = False
+                    break
+        mask[i] = is_pivot
+
+    return mask
+
+@njit(cache=True, parallel=True)
+def _low_pivot_mask(low, pvtLenL, pvtLenR):
+    """Mark swing-low bars with an early-exit window test (JIT-compiled when numba is installed)."""
+    n = low.size
+    mask = np.zeros(n, np.bool_)
+
+    for i in prange(pvtLenL, n - pvtLenR):
+        current_low = low[i]
+        is_pivot = True
+        for j in range(i - pvtLenL, i):
+            if low[j] <= current_low:
+                is_pivot = False
+                break
+        if is_pivot:
+            for j in range(i + 1, i + 1 + pvtLenR):
+                if low[j] <= current_low:
+                    is_pivot = False
+                    break
+        mask[i] = is_pivot
+
+    return mask
+
+def _swing_indices_kernel(high, low, pvtLenL, pvtLenR):
+    """Find swing pivot indices via the JIT mask kernels."""
+    return (
+        np.flatnonzero(_high_pivot_mask(high, pvtLenL, pvtLenR)),
+        np.flatnonzero(_low_pivot_mask(low, pvtLenL, pvtLenR))
+    )
+
+def _frame_fingerprint(df):
+    """Cheap cache key for a fetched bar frame, replacing a full-content hash.
+
+    The window endpoints pin the symbol's time range and the edge prices
+    disambiguate symbols sharing it; rows are never edited in place, so
+    this identifies a dataset without hashing every value.
+    """
+    if df.empty:
+        return (0,)
+    return (
+        len(df),
+        df.index[0].value,
+        df.index[-1].value,
+        float(df['high'].iloc[0]),
+        float(df['close'].iloc[-1])
+    )
+
+def _index_key(idx):
+    """Hashable cache key for a DatetimeIndex, which Streamlit cannot hash natively."""
+    return (idx.asi8.tobytes(), str(idx.tz))
+
+# Shared by every cached analytics function so all pandas argument types
+# Streamlit cannot hash are covered in one place
+_HASH_FUNCS = {
+    pd.DataFrame: _frame_fingerprint,
+    pd.DatetimeIndex: _index_key
+}
+
+@st.cache_data(max_entries=32, show_spinner=False, hash_funcs=_HASH_FUNCS)
+def find_swing_dates(data, pvtLenL=3, pvtLenR=3, shunt=1):
+    """Finds all swing high and swing low dates using Pine Script logic."""
+    high = data['high'].to_numpy()
+    low = data['low'].to_numpy()
+    dates = data.index
+
+    if len(data) < pvtLenL + pvtLenR + 1:
+        empty = np.array([], dtype=np.int64)
+        return dates[empty], high[empty], dates[empty], low[empty]
+
+    if NUMBA_AVAILABLE:
+        high_idx, low_idx = _swing_indices_kernel(high, low, pvtLenL, pvtLenR)
+    else:
+        high_idx, low_idx = _swing_indices_numpy(high, low, pvtLenL, pvtLenR)
+
+    return dates[high_idx], high[high_idx], dates[low_idx], low[low_idx]
+
+@dataclass(frozen=True)
+class Projections:
+    """Swing pivots and their projected dates in a struct-of-arrays layout."""
+
+    type_label: str
+    dates: pd.DatetimeIndex
+    prices: np.ndarray
+    projected: np.ndarray  # (len(dates), len(PROJECTION_PERIODS)), datetime64[ns] in UTC
+
+    def __len__(self):
+        return len(self.dates)
+
+    def to_dataframe(self):
+        """Build the wide presentation frame used for tables and CSV export."""
+        if len(self) == 0:
+            return pd.DataFrame()
+
+        # Collect every column first and build the DataFrame in one allocation
+        columns = {
+            f'{self.type_label} Date': self.dates,
+            f'{self.type_label} Price': self.prices
+        }
+        for k, period in enumerate(PROJECTION_PERIODS):
+            column = pd.DatetimeIndex(self.projected[:, k])
+            if self.dates.tz is not None:
+                column = column.tz_localize(_UTC).tz_convert(self.dates.tz)
+            columns[f'{self.type_label} +{period}d'] = column
+
+        return pd.DataFrame(columns, copy=False)
+
+@st.cache_data(max_entries=32, show_spinner=False, hash_funcs=_HASH_FUNCS)
+def calculate_projected_dates(dates, prices, type_label):
+    """Calculate projected dates for each swing date."""
+    idx = pd.DatetimeIndex(dates)
+
+    # One broadcast add builds the whole projection matrix at once; .values
+    # is the raw UTC nanosecond buffer for tz-aware indexes
+    projected = idx.values[:, None] + np.asarray(PROJECTION_PERIODS, dtype='timedelta64[D]')
+
+    return Projections(type_label, idx, np.asarray(prices), projected)